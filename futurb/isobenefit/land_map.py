@@ -1,13 +1,12 @@
 from __future__ import annotations
 
-import copy
 import logging
 import os
-from functools import partial
 from pathlib import Path
 
 import numpy as np
-from scipy.ndimage import measurements as measure
+from scipy.ndimage import binary_dilation, distance_transform_edt, label
+from scipy.spatial import cKDTree
 
 from .logger import get_logger
 
@@ -16,82 +15,16 @@ LOGGER: logging.Logger = get_logger()
 DENSITY_LEVELS = ["high", "medium", "low"]
 
 
-class MapBlock:
-    """Represents a cell."""
-
-    x: int
-    y: int
-    _is_nature: bool
-    _is_built: bool
-    _is_centrality: bool
-    _inhabitants: float
-    _density_level: str | None
-
-    def __init__(self, x: int, y: int, inhabitants: float = 0.0):
-        """ """
-        self.x = x
-        self.y = y
-        self._is_nature = True
-        self._is_built = False
-        self._is_centrality = False
-        self._inhabitants = inhabitants
-        self._density_level = None
-
-    @property
-    def is_nature(self) -> bool:
-        """ """
-        return self._is_nature
-
-    @is_nature.setter
-    def is_nature(self, nature_state: bool) -> None:
-        """ """
-        self._is_nature = nature_state
-        if nature_state is True:
-            self._is_built = False
-            self._is_centrality = False
-
-    @property
-    def is_built(self) -> bool:
-        """ """
-        return self._is_built
-
-    @is_built.setter
-    def is_built(self, built_state: bool) -> None:
-        """ """
-        self._is_built = built_state
-        if built_state is True:
-            self._is_nature = False
-
-    @property
-    def is_centrality(self) -> bool:
-        """ """
-        return self._is_centrality
-
-    @is_centrality.setter
-    def is_centrality(self, centrality_state: bool) -> None:
-        """ """
-        self._is_centrality = centrality_state
-        if centrality_state is True:
-            self._is_built = True
-            self._is_nature = False
-
-    @property
-    def inhabitants(self) -> float:
-        """ """
-        return self._inhabitants
-
-    @property
-    def density_level(self) -> str | None:
-        """ """
-        return self._density_level
-
-    # TODO: confirm population_density type
-    def set_block_population(
-        self, block_population: float, density_level: str, population_density: dict[str, float]
-    ) -> None:
-        """ """
-        self._inhabitants = block_population * population_density[density_level]
-        self._density_level = density_level
+# per-cell state codes held in state_arr
+NATURE = 0
+BUILT = 1
+CENTRALITY = 2
+# density field holds an index into DENSITY_LEVELS, with -1 for unpopulated cells
+NO_DENSITY = -1
+# all per-cell fields interleaved in one record, so a cell's state is read from a single cache line
+CELL_DTYPE = np.dtype([("state", np.int8), ("density", np.int8), ("inhabitants", np.float64)])
+# the four rook neighbours of a cell, excluding the cell itself
+ROOK_NEIGHBOURS = np.array([[0, 1, 0], [1, 0, 1], [0, 1, 0]], dtype=bool)
 
 
 class Land:
@@ -109,7 +42,10 @@ class Land:
     prob_distribution: tuple[float, float, float]
     density_factors: tuple[float, float, float]
     # state
-    map: list[list[MapBlock]]
+    _cells: np.ndarray
+    state_arr: np.ndarray
+    density_arr: np.ndarray
+    population_arr: np.ndarray
     avg_dist_from_nature: float
     avg_dist_from_centr: float
     max_dist_from_nature: float
@@ -120,6 +56,11 @@ class Land:
     current_free_nature: float
     avg_dist_from_nature_wide: float
     max_dist_from_nature_wide: float
+    # precomputed
+    _centrality_stamp: np.ndarray
+    _level_population: np.ndarray
+    _cumulative_prob: np.ndarray
+    _interior: np.ndarray
 
     def __init__(
         self,
@@ -147,8 +88,24 @@ class Land:
         self.max_ab_km2 = max_ab_km2
         self.prob_distribution = prob_distribution
         self.density_factors = density_factors
+        # disc of the cells within T_star of a point - computed once instead of per mask
+        t_offsets = np.arange(-T_star, T_star + 1)
+        self._centrality_stamp = t_offsets[:, None] ** 2 + t_offsets[None, :] ** 2 <= T_star**2
+        # inhabitants of a block at each density level, looked up whenever a block is built or densified
+        self._level_population = self.block_pop * np.asarray(density_factors, dtype=np.float64)
+        # normalised cumulative distribution of the density levels, sampled with searchsorted
+        cumulative_prob = np.cumsum(prob_distribution, dtype=np.float64)
+        self._cumulative_prob = cumulative_prob / cumulative_prob[-1]
+        # cells at least T_star from the edges, the only ones the scenarios update
+        self._interior = np.zeros((size_x, size_y), dtype=bool)
+        self._interior[T_star : size_x - T_star, T_star : size_y - T_star] = True
         # state
-        self.map = [[MapBlock(x, y, inhabitants=0) for x in range(size_y)] for y in range(size_x)]
+        self._cells = np.zeros((size_x, size_y), dtype=CELL_DTYPE)
+        self._cells["density"] = NO_DENSITY
+        # field views into the shared buffer, writes go straight through to the cells
+        self.state_arr = self._cells["state"]
+        self.density_arr = self._cells["density"]
+        self.population_arr = self._cells["inhabitants"]
         self.avg_dist_from_nature = 0
         self.avg_dist_from_centr = 0
         self.max_dist_from_nature = 0
@@ -165,109 +122,117 @@ class Land:
         """ """
         return self.max_ab_km2 / (self.T_star**2)
 
-    @property
-    def population_density(self) -> dict[str, float]:
-        """ """
-        return {
-            "high": self.density_factors[0],
-            "medium": self.density_factors[1],
-            "low": self.density_factors[2],
-            "empty": 0,
-        }
-
-    def get_map_as_array(self):
+    def draw_density_levels(self) -> np.ndarray:
+        """Random density level index for every cell, following prob_distribution."""
+        draws = np.random.random((self.size_x, self.size_y))
+        return np.searchsorted(self._cumulative_prob, draws, side="right")
+
+    def set_built(self, x: int, y: int, density_level: int) -> None:
         """ """
-        map_array = np.full((self.size_x, self.size_y), 0)
-        population_array = np.full((self.size_x, self.size_y), 0.0, dtype=np.float_)
-        for x in range(self.size_x):
-            for y in range(self.size_y):
-                if self.map[x][y].is_built:
-                    map_array[x, y] = 1
-                if self.map[x][y].is_centrality:
-                    map_array[x, y] = 2
-                population_array[x, y] = self.map[x][y].inhabitants
-
-        return map_array, population_array
-
-    def is_any_neighbor_built(self, x: int, y: int) -> bool:
+        self.state_arr[x, y] = BUILT
+        self.set_density(x, y, density_level)
+
+    def set_density(self, x: int, y: int, density_level: int) -> None:
         """ """
-        assert self.T_star <= x <= self.size_x - self.T_star, f"point ({x},{y}) is not in the 'interior' of the land"
-        assert self.T_star <= y <= self.size_y - self.T_star, f"point ({x},{y}) is not in the 'interior' of the land"
-        return (
-            self.map[x - 1][y].is_built
-            or self.map[x + 1][y].is_built
-            or self.map[x][y - 1].is_built
-            or self.map[x][y + 1].is_built
-        )
+        self.density_arr[x, y] = density_level
+        self.population_arr[x, y] = self._level_population[density_level]
 
-    def is_centrality_near(self, x: int, y: int) -> bool:
+    def set_centrality(self, x: int, y: int) -> None:
         """ """
-        assert self.T_star <= x <= self.size_x - self.T_star, f"point ({x},{y}) is not in the 'interior' of the land"
-        assert self.T_star <= y <= self.size_y - self.T_star, f"point ({x},{y}) is not in the 'interior' of the land"
-        for i in range(x - self.T_star, x + self.T_star + 1):
-            for j in range(y - self.T_star, y + self.T_star + 1):
-                if self.map[i][j].is_centrality:
-                    if d(x, y, i, j) <= self.T_star:
-                        return True
-        return False
-
-    def nature_stays_extended(self, x: int, y: int) -> bool:
+        self.state_arr[x, y] = CENTRALITY
+        self.density_arr[x, y] = NO_DENSITY
+        self.population_arr[x, y] = 0.0
+
+    def built_neighbours_mask(self) -> np.ndarray:
+        """Boolean array flagging cells with at least one built rook neighbour."""
+        # dilating the built cells by the rook neighbourhood marks the whole frontier in one pass
+        return binary_dilation(self.state_arr != NATURE, structure=ROOK_NEIGHBOURS)
+
+    def centrality_reach_mask(self) -> np.ndarray:
+        """Boolean array flagging cells within T_star of a centrality."""
+        land_array = self.state_arr
+        reach_mask = np.zeros(land_array.shape, dtype=bool)
+        # centralities are sparse, so stamp the T_star disc around each rather than searching around every cell
+        for x, y in zip(*np.nonzero(land_array == CENTRALITY)):
+            x_start, x_end = max(0, x - self.T_star), min(self.size_x, x + self.T_star + 1)
+            y_start, y_end = max(0, y - self.T_star), min(self.size_y, y + self.T_star + 1)
+            reach_mask[x_start:x_end, y_start:y_end] |= self._centrality_stamp[
+                x_start - x + self.T_star : x_end - x + self.T_star, y_start - y + self.T_star : y_end - y + self.T_star
+            ]
+        return reach_mask
+
+    def nature_width_flags(self, land_array: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """Whether the nature along each row and along each column is wide enough."""
+        if land_array is None:
+            land_array = self.state_arr
+        nature_array = land_array == NATURE
+        wide_rows = np.array([is_nature_wide_along_axis(nature_row, self.T_star) for nature_row in nature_array])
+        wide_cols = np.array([is_nature_wide_along_axis(nature_col, self.T_star) for nature_col in nature_array.T])
+        return wide_rows, wide_cols
+
+    def update_nature_width_flags(
+        self, x: int, y: int, land_array: np.ndarray, wide_rows: np.ndarray, wide_cols: np.ndarray
+    ) -> None:
         """ """
-        # this method assumes that x,y belongs to a natural region
-        land_array, _ = self.get_map_as_array()
-        land_array[x, y] = 1
-        nature_array = np.where(land_array == 0, 1, 0)
-        _labels, num_features = measure.label(nature_array)
-        is_nature_extended = False
-        if num_features == 1:
-            is_nature_extended = True
-
-        is_wide_enough_height = np.apply_along_axis(
-            partial(is_nature_wide_along_axis, T_star=self.T_star),
-            axis=1,
-            arr=nature_array,
-        )
-        is_wide_enough_width = np.apply_along_axis(
-            partial(is_nature_wide_along_axis, T_star=self.T_star),
-            axis=0,
-            arr=nature_array,
-        )
-        narrow_places_h = len(is_wide_enough_height) - is_wide_enough_height.sum()
-        narrow_places_w = len(is_wide_enough_width) - is_wide_enough_width.sum()
-
-        return narrow_places_h == 0 and narrow_places_w == 0 and is_nature_extended
+        wide_rows[x] = is_nature_wide_along_axis(land_array[x] == NATURE, self.T_star)
+        wide_cols[y] = is_nature_wide_along_axis(land_array[:, y] == NATURE, self.T_star)
 
-    def nature_stays_reachable(self, x: int, y: int) -> bool:
+    def nature_stays_extended(
+        self,
+        x: int,
+        y: int,
+        land_array: np.ndarray | None = None,
+        wide_rows: np.ndarray | None = None,
+        wide_cols: np.ndarray | None = None,
+    ) -> bool:
         """ """
-        land_array, _ = self.get_map_as_array()
-        land_array[x, y] = 1
-        x_built, y_built = np.where(land_array > 0)
-        x_nature, y_nature = np.where(land_array == 0)
-        return (
-            np.sqrt((x_built[:, None] - x_nature) ** 2 + (y_built[:, None] - y_nature) ** 2).min(axis=1).max()
-            <= self.T_star
-        )
+        # this method assumes that x,y belongs to a natural region
+        if land_array is None:
+            land_array = self.state_arr
+        if wide_rows is None or wide_cols is None:
+            wide_rows, wide_cols = self.nature_width_flags(land_array)
+        # building x,y only changes row x and column y, so every other row and column keeps its current flag
+        if np.count_nonzero(~wide_rows) > (not wide_rows[x]) or np.count_nonzero(~wide_cols) > (not wide_cols[y]):
+            return False
+        # tentatively build the cell in place, rolling back once the nature mask is extracted
+        prev_state = land_array[x, y]
+        land_array[x, y] = BUILT
+        nature_array = land_array == NATURE
+        land_array[x, y] = prev_state
+        if not is_nature_wide_along_axis(nature_array[x], self.T_star):
+            return False
+        if not is_nature_wide_along_axis(nature_array[:, y], self.T_star):
+            return False
+        _labels, num_features = label(nature_array)
+        return num_features == 1
+
+    def nature_stays_reachable(self, x: int, y: int, land_array: np.ndarray | None = None) -> bool:
+        """ """
+        if land_array is None:
+            land_array = self.state_arr
+        # tentatively build the cell in place, rolling back once the distances are computed
+        prev_state = land_array[x, y]
+        land_array[x, y] = BUILT
+        # one exact euclidean distance transform gives every built cell's distance to its nearest nature cell,
+        # rather than building the full built-by-nature distance matrix
+        distances_from_nature = distance_transform_edt(land_array != NATURE)
+        land_array[x, y] = prev_state
+        return distances_from_nature.max() <= self.T_star
 
     def set_configuration_from_image(self, filepath: Path):
         """ """
         array_map = import_2Darray_from_image(filepath)
-        for x in range(self.size_x):
-            for y in range(self.size_y):
-                if array_map[x, y] == 1:
-                    self.map[x][y].is_centrality = True
-
-                if array_map[x, y] == 0:
-                    self.map[x][y].is_built = True
-                    self.map[x][y].is_centrality = False
+        self.state_arr[array_map == 1] = CENTRALITY
+        self.state_arr[array_map == 0] = BUILT
 
     def set_current_counts(self, urbanism_model: str):
         """ """
-        land_array, population_array = self.get_map_as_array()
+        land_array, population_array = self.state_arr, self.population_arr
         self.current_population = population_array.sum()
-        self.current_centralities = np.where(land_array == 2, 1, 0).sum()
-        self.current_built_blocks = np.where(land_array > 0, 1, 0).sum()
-        self.current_free_nature = np.where(land_array == 0, 1, 0).sum()
-        tot_inhabited_blocks = np.where(land_array == 1, 1, 0).sum()
+        self.current_centralities = np.where(land_array == CENTRALITY, 1, 0).sum()
+        self.current_built_blocks = np.where(land_array != NATURE, 1, 0).sum()
+        self.current_free_nature = np.where(land_array == NATURE, 1, 0).sum()
+        tot_inhabited_blocks = np.where(land_array == BUILT, 1, 0).sum()
 
         if tot_inhabited_blocks == 0:
             self.avg_dist_from_nature = 0
@@ -275,32 +240,25 @@ class Land:
             self.max_dist_from_nature = 0
             self.max_dist_from_centr = 0
         else:
-            x_centr, y_centr = np.where(land_array == 2)
-            x_built, y_built = np.where(land_array == 1)
-            distances_from_centr = np.sqrt((x_built[:, None] - x_centr) ** 2 + (y_built[:, None] - y_centr) ** 2).min(
-                axis=1
-            )
+            x_centr, y_centr = np.where(land_array == CENTRALITY)
+            x_built, y_built = np.where(land_array == BUILT)
+            distances_from_centr = nearest_distances(x_built, y_built, x_centr, y_centr)
             self.avg_dist_from_centr = distances_from_centr.sum() / tot_inhabited_blocks
             self.max_dist_from_centr = distances_from_centr.max()
 
-            x_nature, y_nature = np.where(land_array == 0)
+            x_nature, y_nature = np.where(land_array == NATURE)
 
             if urbanism_model == "classical":
-                nature_array = np.where(land_array == 0, 1, 0)
-                features, _labels = measure.label(nature_array)
-                unique, counts = np.unique(features, return_counts=True)
-                large_natural_regions = counts[1:] >= self.T_star**2
-                large_natural_regions_labels = unique[1:][large_natural_regions]
-                x_nature_wide, y_nature_wide = np.where(np.isin(features, large_natural_regions_labels))
-                distances_from_nature_wide = np.sqrt(
-                    (x_built[:, None] - x_nature_wide) ** 2 + (y_built[:, None] - y_nature_wide) ** 2
-                ).min(axis=1)
+                labels, _num_features = label(land_array == NATURE)
+                # region sizes indexed by label, then mapped back onto the cells - label 0 is the built land
+                large_natural_regions = np.bincount(labels.ravel()) >= self.T_star**2
+                large_natural_regions[0] = False
+                x_nature_wide, y_nature_wide = np.nonzero(large_natural_regions[labels])
+                distances_from_nature_wide = nearest_distances(x_built, y_built, x_nature_wide, y_nature_wide)
                 self.avg_dist_from_nature_wide = distances_from_nature_wide.sum() / tot_inhabited_blocks
                 self.max_dist_from_nature_wide = distances_from_nature_wide.max()
 
-            distances_from_nature = np.sqrt(
-                (x_built[:, None] - x_nature) ** 2 + (y_built[:, None] - y_nature) ** 2
-            ).min(axis=1)
+            distances_from_nature = nearest_distances(x_built, y_built, x_nature, y_nature)
             self.avg_dist_from_nature = distances_from_nature.sum() / tot_inhabited_blocks
             self.max_dist_from_nature = distances_from_nature.max()
 
@@ -352,20 +310,26 @@ class Land:
                 )
 
 
-def d(x1: int, y1: int, x2: int, y2: int) -> float:
-    """ """
-    return np.sqrt((x1 - x2) ** 2 + (y1 - y2) ** 2)
+def nearest_distances(from_x: np.ndarray, from_y: np.ndarray, to_x: np.ndarray, to_y: np.ndarray) -> np.ndarray:
+    """Distance from each "from" cell to its nearest "to" cell."""
+    # a KD-tree avoids building the full pairwise distance matrix, and queries run across all cores
+    tree = cKDTree(np.column_stack((to_x, to_y)))
+    distances, _idxs = tree.query(np.column_stack((from_x, from_y)), workers=-1)
+    return distances
 
 
 # TODO: check array_1d type
 def is_nature_wide_along_axis(array_1d, T_star: int) -> bool:
     """ """
-    features, _labels = measure.label(array_1d)
-    _unique, counts = np.unique(features, return_counts=True)
-    if len(counts) > 1:
-        return counts[1:].min() >= T_star
-    else:
+    is_nature = np.asarray(array_1d) != 0
+    # nature spanning the full axis counts as wide
+    if is_nature.all():
         return True
+    # locate the start and end of each run of nature directly, rather than labelling and counting unique labels
+    edges = np.diff(np.concatenate(([0], is_nature, [0])).astype(np.int8))
+    run_starts = np.flatnonzero(edges == 1)
+    run_ends = np.flatnonzero(edges == -1)
+    return bool(np.all(run_ends - run_starts >= T_star))
 
 
 class IsobenefitScenario(Land):
@@ -375,49 +339,48 @@ class IsobenefitScenario(Land):
         """ """
         added_blocks = 0
         added_centrality = 0
-        copy_land = copy.deepcopy(self)
-        for x in range(self.T_star, self.size_x - self.T_star):
-            for y in range(self.T_star, self.size_y - self.T_star):
-                block = self.map[x][y]
-                assert (block.is_nature and not block.is_built) or (
-                    block.is_built and not block.is_nature
-                ), f"({x},{y}) block has ambiguous coordinates"
-                if block.is_nature:
-                    if copy_land.is_any_neighbor_built(x, y):
-                        if copy_land.is_centrality_near(x, y):
-                            if self.nature_stays_extended(x, y):
-                                if np.random.rand() < self.build_probability:
-                                    if self.nature_stays_reachable(x, y):
-                                        density_level = np.random.choice(
-                                            DENSITY_LEVELS,
-                                            p=self.prob_distribution,
-                                        )
-                                        block.is_built = True
-                                        block.set_block_population(
-                                            self.block_pop,
-                                            density_level,
-                                            self.population_density,
-                                        )
-                                        added_blocks += 1
-                        else:
-                            if np.random.rand() < self.neighboring_centrality_probability:
-                                if self.nature_stays_extended(x, y):
-                                    if self.nature_stays_reachable(x, y):
-                                        block.is_centrality = True
-                                        block.set_block_population(
-                                            self.block_pop,
-                                            "empty",
-                                            self.population_density,
-                                        )
-                                        added_centrality += 1
+        # masks of the land as it was at the start of the step, computed before any cell changes
+        built_nbs = self.built_neighbours_mask()
+        centrality_near = self.centrality_reach_mask()
+        # live land state, shared by the nature checks
+        land_array = self.state_arr
+        # loop invariants, computed once rather than per cell
+        isolated_centrality_probability = self.isolated_centrality_probability / (self.size_x * self.size_y)
+        # one uniform per cell drawn in a single batch, the branches below each use at most one
+        draws = np.random.random((self.size_x, self.size_y))
+        density_levels = self.draw_density_levels()
+        # per row and column nature width, refreshed for the row and column of each cell built below
+        wide_rows, wide_cols = self.nature_width_flags(land_array)
+        # cells only change on their own visit, so the interior nature cells can be gathered up front
+        # np.nonzero keeps the row by row visiting order
+        candidates = self._interior & (land_array == NATURE)
+        # without isolated centralities only the frontier next to built land can change
+        if isolated_centrality_probability <= 0:
+            candidates &= built_nbs
+        for x, y in zip(*np.nonzero(candidates)):
+            if built_nbs[x, y]:
+                if centrality_near[x, y]:
+                    if self.nature_stays_extended(x, y, land_array, wide_rows, wide_cols):
+                        if draws[x, y] < self.build_probability:
+                            if self.nature_stays_reachable(x, y, land_array):
+                                self.set_built(x, y, density_levels[x, y])
+                                self.update_nature_width_flags(x, y, land_array, wide_rows, wide_cols)
+                                added_blocks += 1
+                else:
+                    if draws[x, y] < self.neighboring_centrality_probability:
+                        if self.nature_stays_extended(x, y, land_array, wide_rows, wide_cols):
+                            if self.nature_stays_reachable(x, y, land_array):
+                                self.set_centrality(x, y)
+                                self.update_nature_width_flags(x, y, land_array, wide_rows, wide_cols)
+                                added_centrality += 1
 
-                    else:
-                        if np.random.rand() < self.isolated_centrality_probability / (self.size_x * self.size_y):
-                            if self.nature_stays_extended(x, y):
-                                if self.nature_stays_reachable(x, y):
-                                    block.is_centrality = True
-                                    block.set_block_population(self.block_pop, "empty", self.population_density)
-                                    added_centrality += 1
+            else:
+                if draws[x, y] < isolated_centrality_probability:
+                    if self.nature_stays_extended(x, y, land_array, wide_rows, wide_cols):
+                        if self.nature_stays_reachable(x, y, land_array):
+                            self.set_centrality(x, y)
+                            self.update_nature_width_flags(x, y, land_array, wide_rows, wide_cols)
+                            added_centrality += 1
         LOGGER.info(f"added blocks: {added_blocks}")
         LOGGER.info(f"added centralities: {added_centrality}")
         return added_blocks, added_centrality
@@ -427,65 +390,61 @@ class ClassicalScenario(Land):
     """ """
 
     def is_any_neighbor_centrality(self, x: int, y: int) -> bool:
+        state_arr = self.state_arr
         return (
-            self.map[x - 1][y].is_centrality
-            or self.map[x + 1][y].is_centrality
-            or self.map[x][y - 1].is_centrality
-            or self.map[x][y + 1].is_centrality
+            state_arr[x - 1, y] == CENTRALITY
+            or state_arr[x + 1, y] == CENTRALITY
+            or state_arr[x, y - 1] == CENTRALITY
+            or state_arr[x, y + 1] == CENTRALITY
         )
 
     def update_map(self) -> tuple[int, int]:
         """ """
         added_blocks = 0
         added_centrality = 0
-        copy_land = copy.deepcopy(self)
-        for x in range(self.T_star, self.size_x - self.T_star):
-            for y in range(self.T_star, self.size_y - self.T_star):
-                block = self.map[x][y]
-                assert (block.is_nature and not block.is_built) or (
-                    block.is_built and not block.is_nature
-                ), f"({x},{y}) block has ambiguous coordinates"
-                if block.is_nature:
-                    if copy_land.is_any_neighbor_built(x, y):
-                        if np.random.rand() < self.build_probability:
-                            density_level = np.random.choice(DENSITY_LEVELS, p=self.prob_distribution)
-                            block.is_nature = False
-                            block.is_built = True
-                            block.set_block_population(self.block_pop, density_level, self.population_density)
-                            added_blocks += 1
+        # mask of the land as it was at the start of the step, computed before any cell changes
+        built_nbs = self.built_neighbours_mask()
+        state_arr = self.state_arr
+        density_arr = self.density_arr
+        # loop invariants, computed once rather than per cell
+        high, medium, low = range(len(DENSITY_LEVELS))
+        isolated_centrality_probability = self.isolated_centrality_probability / np.sqrt(self.size_x * self.size_y)
+        # equivalent to current_built_blocks / current_centralities > 100 without dividing
+        few_centralities = self.current_built_blocks > 100 * self.current_centralities
+        # one uniform per cell drawn in a single batch, the branches below each use at most one
+        draws = np.random.random((self.size_x, self.size_y))
+        density_levels = self.draw_density_levels()
+        # cells only change on their own visit, so the interior cells that can change are gathered up front
+        # np.nonzero keeps the row by row visiting order
+        isolated_centralities = few_centralities and isolated_centrality_probability > 0
+        actionable = (state_arr == BUILT) | ((state_arr == NATURE) & (built_nbs | isolated_centralities))
+        for x, y in zip(*np.nonzero(self._interior & actionable)):
+            if state_arr[x, y] == NATURE:
+                if built_nbs[x, y]:
+                    if draws[x, y] < self.build_probability:
+                        self.set_built(x, y, density_levels[x, y])
+                        added_blocks += 1
 
+                else:
+                    if draws[x, y] < isolated_centrality_probability and few_centralities:
+                        self.set_centrality(x, y)
+                        added_centrality += 1
+            elif state_arr[x, y] == BUILT:
+                if density_arr[x, y] == low:
+                    if draws[x, y] < 0.1:
+                        self.set_density(x, y, medium)
+                elif density_arr[x, y] == medium:
+                    if draws[x, y] < 0.01:
+                        self.set_density(x, y, high)
+                elif density_arr[x, y] == high and few_centralities:
+                    if self.is_any_neighbor_centrality(x, y):
+                        if draws[x, y] < self.neighboring_centrality_probability:
+                            self.set_centrality(x, y)
+                            added_centrality += 1
                     else:
-                        if (
-                            np.random.rand() < self.isolated_centrality_probability / np.sqrt(self.size_x * self.size_y)
-                            and (self.current_built_blocks / self.current_centralities) > 100
-                        ):
-                            block.is_centrality = True
-                            block.set_block_population(self.block_pop, "empty", self.population_density)
+                        if draws[x, y] < self.isolated_centrality_probability:  # /np.sqrt(self.current_built_blocks):
+                            self.set_centrality(x, y)
                             added_centrality += 1
-                else:
-                    if not block.is_centrality:
-                        if block.density_level == "low":
-                            if np.random.rand() < 0.1:
-                                block.set_block_population(self.block_pop, "medium", self.population_density)
-                        elif block.density_level == "medium":
-                            if np.random.rand() < 0.01:
-                                block.set_block_population(self.block_pop, "high", self.population_density)
-                        elif (
-                            block.density_level == "high"
-                            and (self.current_built_blocks / self.current_centralities) > 100
-                        ):
-                            if self.is_any_neighbor_centrality(x, y):
-                                if np.random.rand() < self.neighboring_centrality_probability:
-                                    block.is_centrality = True
-                                    block.set_block_population(self.block_pop, "empty", self.population_density)
-                                    added_centrality += 1
-                            else:
-                                if (
-                                    np.random.rand() < self.isolated_centrality_probability
-                                ):  # /np.sqrt(self.current_built_blocks):
-                                    block.is_centrality = True
-                                    block.set_block_population(self.block_pop, "empty", self.population_density)
-                                    added_centrality += 1
 
         LOGGER.info(f"added blocks: {added_blocks}")
         LOGGER.info(f"added centralities: {added_centrality}")
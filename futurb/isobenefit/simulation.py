@@ -9,20 +9,21 @@ from typing import Any, cast
 
 import numpy as np
 import rasterio as rio
+from dateutil.relativedelta import relativedelta
 from qgis.core import (
     QgsContrastEnhancement,
     QgsCoordinateReferenceSystem,
     QgsDateTimeRange,
+    QgsGeometry,
     QgsLayerTreeGroup,
     QgsMultiBandColorRenderer,
     QgsProject,
     QgsRasterLayer,
     QgsRasterLayerTemporalProperties,
-    QgsVectorLayer,
 )
 from rasterio import transform
 
-from .land_map import ClassicalScenario, IsobenefitScenario, Land, MapBlock
+from .land_map import BUILT, CENTRALITY, NATURE, ClassicalScenario, IsobenefitScenario, Land
 from .logger import configure_logging, get_logger
 
 N_AMENITIES = 1
@@ -34,12 +35,13 @@ def get_central_coord(size_x: int, size_y: int) -> list[tuple[int, int]]:
 
 
 def run_isobenefit_simulation(
-    extents_layer: QgsVectorLayer,
+    extents_geom: QgsGeometry,
     target_crs: QgsCoordinateReferenceSystem,
     granularity_m: int,
     n_steps: int,
     out_dir_path: Path,
     out_file_name: str,
+    start_date: datetime,
     build_probability: float,
     neighboring_centrality_probability: float,
     isolated_centrality_probability: float,
@@ -56,11 +58,12 @@ def run_isobenefit_simulation(
     configure_logging()
     LOGGER = get_logger()
     np.random.seed(random_seed)
-    # prepare extents
-    x_min = extents_layer.extent().xMinimum()
-    x_max = extents_layer.extent().xMaximum()
-    y_min = extents_layer.extent().yMinimum()
-    y_max = extents_layer.extent().yMaximum()
+    # prepare extents - expects the geometry to be in the target CRS
+    extents = extents_geom.boundingBox()
+    x_min = extents.xMinimum()
+    x_max = extents.xMaximum()
+    y_min = extents.yMinimum()
+    y_max = extents.yMaximum()
     x_min = int(x_min - x_min % granularity_m)
     x_max = int(x_max - x_max % granularity_m) + granularity_m
     y_min = int(y_min - y_min % granularity_m)
@@ -120,6 +123,7 @@ def run_isobenefit_simulation(
         size_y,
         target_crs,
         layer_group,
+        start_date,
     )
     land.set_record_counts_header(output_path=out_dir_path, urbanism_model=urbanism_model)
     land.set_current_counts(urbanism_model)
@@ -161,6 +165,7 @@ def run_isobenefit_simulation(
             size_y,
             target_crs,
             layer_group,
+            start_date,
         )
         idx += 1
     # save_min_distances(land, out_dir_path)
@@ -229,9 +234,8 @@ def initialize_land(
     else:
         raise ValueError("Invalid urbanism model. Choose one of 'isobenefit' and 'classical'")
     if mode == "list":
-        amenities: list[MapBlock] = [MapBlock(x, y, inhabitants=0) for (x, y) in amenities_list]
-        for amenity in amenities:
-            amenity.is_centrality = True
+        for x, y in amenities_list:
+            land.set_centrality(x, y)
     else:
         raise Exception('Invalid initialization mode. Valid modes are "image" and "list".')
 
@@ -240,20 +244,12 @@ def initialize_land(
 
 def update_map_snapshot(land: Land, canvas) -> None:
     """ """
-    for row in land.map:
-        for block in row:
-            if block.is_nature:
-                color = (0 / 255, 158 / 255, 96 / 255)  # green
-            elif block.is_centrality:
-                color = np.ones(3)
-            else:
-                if block.is_built and block.density_level == "high":
-                    color = np.zeros(3)
-                if block.is_built and block.density_level == "medium":
-                    color = np.ones(3) / 3
-                if block.is_built and block.density_level == "low":
-                    color = np.ones(3) * 2 / 3
-            canvas[block.y, block.x] = color
+    canvas[land.state_arr == NATURE] = (0 / 255, 158 / 255, 96 / 255)  # green
+    canvas[land.state_arr == CENTRALITY] = np.ones(3)
+    built = land.state_arr == BUILT
+    # high, medium and low density shades by density index
+    for density_level, color in enumerate((np.zeros(3), np.ones(3) / 3, np.ones(3) * 2 / 3)):
+        canvas[built & (land.density_arr == density_level)] = color
 
 
 def save_snapshot(
@@ -269,6 +265,7 @@ def save_snapshot(
     size_y: int,
     target_crs: QgsCoordinateReferenceSystem,
     layer_group: QgsLayerTreeGroup,
+    start_date: datetime,
 ) -> None:
     """ """
     out_name = f"{out_file_name}_{step:05d}"
@@ -287,8 +284,9 @@ def save_snapshot(
         transform=trf,
         nodata=np.nan,
     ) as out_rast:  # type: ignore
-        # expects bands, rows, columns order
-        out_rast.write(rast_arr.transpose(2, 0, 1))  # type: ignore
+        # expects bands, rows, columns order - the canvas is indexed x, y so rows are its y axis,
+        # flipped so that the first row is at y_max as per the from_bounds transform
+        out_rast.write(np.ascontiguousarray(rast_arr.transpose(2, 1, 0)[:, ::-1, :]))  # type: ignore
         # create QGIS layer and renderer
         rast_layer = QgsRasterLayer(out_path, f"step {step}", providerType="gdal")
         rast_layer.setCrs(target_crs)
@@ -315,9 +313,8 @@ def save_snapshot(
             QgsRasterLayerTemporalProperties, rast_layer.temporalProperties()
         )
         temp_props.setMode(QgsRasterLayerTemporalProperties.ModeFixedTemporalRange)  # type: ignore
-        start_date = datetime.now()
-        this_date = start_date.replace(year=start_date.year + step)
-        next_date = start_date.replace(year=start_date.year + step + 1)
+        this_date = start_date + relativedelta(years=step)
+        next_date = start_date + relativedelta(years=step + 1)
         time_range = QgsDateTimeRange(begin=this_date, end=next_date)
         temp_props.setFixedTemporalRange(time_range)
         temp_props.isVisibleInTemporalRange(time_range)
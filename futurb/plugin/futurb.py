@@ -2,14 +2,17 @@
 from __future__ import annotations
 
 import os.path
-from datetime import datetime
+from dataclasses import asdict
+from datetime import date, datetime
 from typing import Any, Callable, cast
 
+from dateutil.relativedelta import relativedelta
 from qgis.core import (
     Qgis,
     QgsCoordinateTransform,
     QgsDateTimeRange,
     QgsFeature,
+    QgsFeatureSink,
     QgsInterval,
     QgsMessageLog,
     QgsProject,
@@ -17,7 +20,7 @@ from qgis.core import (
     QgsVectorLayer,
 )
 from qgis.gui import QgisInterface
-from qgis.PyQt.QtCore import QCoreApplication, QSettings, QTranslator, qVersion
+from qgis.PyQt.QtCore import QCoreApplication, QSettings, QTranslator
 from qgis.PyQt.QtGui import QIcon
 from qgis.PyQt.QtWidgets import QAction, QToolBar, QWidget
 
@@ -25,16 +28,30 @@ from ..isobenefit.simulation import run_isobenefit_simulation
 from .futurb_dialog import FuturbDialog  # Import the code for the dialog
 from .resources import *  # Initialize Qt resources from file resources.py
 
+# translations are optional: skip locale lookups entirely when none are shipped
+_I18N_DIR = os.path.join(os.path.dirname(__file__), "i18n")
+_HAS_I18N = os.path.isdir(_I18N_DIR)
+# plugin icon from the compiled Qt resources
+_ICON_PATH = ":/plugins/futurb/icon.png"
+# name of the memory layer showing the simulation extents
+_EXTENTS_LAYER_NAME = "sim_input_extents"
+# fixed density distribution and factors for high, medium, and low density blocks
+_DEFAULT_PROB_DIST: tuple[float, float, float] = (0.7, 0.3, 0.0)
+_DEFAULT_DENSITY_FACTORS: tuple[float, float, float] = (1.0, 0.1, 0.01)
+
 
 class Futurb:
     """QGIS Plugin Implementation."""
 
     iface: QgisInterface
     plugin_dir: str
-    dlg: FuturbDialog
+    _dlg: FuturbDialog | None
     actions: list[QAction]
     menu: str
     toolbar: QToolBar
+    _xform_cache: dict[tuple[str, str], QgsCoordinateTransform]
+    # shared across instances so that the resource lookup only happens once
+    _icon: QIcon | None = None
 
     def __init__(self, iface: QgisInterface):
         """Constructor.
@@ -49,21 +66,40 @@ class Futurb:
         # initialize plugin directory
         self.plugin_dir = os.path.dirname(__file__)
         # initialize locale
-        locale = QSettings().value("locale/userLocale")[0:2]
-        locale_path = os.path.join(self.plugin_dir, "i18n", "Futurb_{}.qm".format(locale))
-        if os.path.exists(locale_path):
-            self.translator = QTranslator()
-            self.translator.load(locale_path)
-            if qVersion() > "4.3.3":
+        if _HAS_I18N:
+            locale = QSettings().value("locale/userLocale")[0:2]
+            locale_path = os.path.join(_I18N_DIR, "Futurb_{}.qm".format(locale))
+            if os.path.exists(locale_path):
+                self.translator = QTranslator()
+                self.translator.load(locale_path)
                 QCoreApplication.installTranslator(self.translator)
-        # Create the dialog (after translation) and keep reference
-        self.dlg = FuturbDialog()
+        # the dialog is created (after translation) on first use
+        self._dlg = None
         # Declare instance attributes
         self.actions = []
         self.menu = self.tr("&Future Urban Growth test.")
         # TODO: We are going to let the user set this up in a future iteration
-        self.toolbar = self.iface.addToolBar("Futurb")
+        # reuse the toolbar if it survived a previous load of the plugin
+        existing_toolbar = self.iface.mainWindow().findChild(QToolBar, "Futurb")
+        self.toolbar = existing_toolbar or self.iface.addToolBar("Futurb")
         self.toolbar.setObjectName("Futurb")
+        # coordinate transforms keyed by source and target CRS WKT - authids are empty for custom CRSs
+        self._xform_cache = {}
+        # cached transforms carry the project's transform context, so drop them when the project changes
+        project = QgsProject.instance()
+        project.cleared.connect(self._clear_xform_cache)
+        project.transformContextChanged.connect(self._clear_xform_cache)
+
+    @property
+    def dlg(self) -> FuturbDialog:
+        """The plugin dialog, created on first access."""
+        if self._dlg is None:
+            # parented to the main window so the non-modal dialog stays above it and is owned by it
+            self._dlg = FuturbDialog(self.iface.mainWindow())
+            # the dialog is non-modal, so the work happens in response to its signals
+            self._dlg.accepted.connect(self._on_accept)
+            self._dlg.rejected.connect(self._on_reject)
+        return self._dlg
 
     def tr(self, message: str):
         """Get the translation for a string using Qt translation API.
@@ -80,7 +116,7 @@ class Futurb:
 
     def add_action(
         self,
-        icon_path: str,
+        icon_path: str | QIcon,
         text: str,
         callback: Callable[[Any], Any],
         enabled_flag: bool = True,
@@ -93,8 +129,9 @@ class Futurb:
         """Add a toolbar icon to the toolbar.
 
         :param icon_path: Path to the icon for this action. Can be a resource
-            path (e.g. ':/plugins/foo/bar.png') or a normal file system path.
-        :type icon_path: str
+            path (e.g. ':/plugins/foo/bar.png'), a normal file system path,
+            or an already constructed icon.
+        :type icon_path: str, QIcon
 
         :param text: Text that should be shown in menu items for this action.
         :type text: str
@@ -129,7 +166,7 @@ class Futurb:
         :rtype: QAction
         """
 
-        icon = QIcon(icon_path)
+        icon = icon_path if isinstance(icon_path, QIcon) else QIcon(icon_path)
         action = QAction(icon, text, parent)
         action.triggered.connect(callback)
         action.setEnabled(enabled_flag)
@@ -155,9 +192,10 @@ class Futurb:
     def initGui(self):
         """Create the menu entries and toolbar icons inside the QGIS GUI."""
 
-        icon_path = ":/plugins/futurb/icon.png"
+        if Futurb._icon is None:
+            Futurb._icon = QIcon(_ICON_PATH)
         self.add_action(
-            icon_path, text=self.tr("Future Urban Growth test."), callback=self.run, parent=self.iface.mainWindow()
+            Futurb._icon, text=self.tr("Future Urban Growth test."), callback=self.run, parent=self.iface.mainWindow()
         )
 
     def unload(self):
@@ -165,69 +203,126 @@ class Futurb:
         for action in self.actions:
             self.iface.removePluginMenu(self.tr("&Future Urban Growth test."), action)
             self.iface.removeToolBarIcon(action)
+            # free the C++ side deterministically rather than waiting on garbage collection
+            action.deleteLater()
+        self.actions = []
         # remove the toolbar
+        self.toolbar.clear()
         del self.toolbar
+        project = QgsProject.instance()
+        project.cleared.disconnect(self._clear_xform_cache)
+        project.transformContextChanged.disconnect(self._clear_xform_cache)
+        self._clear_xform_cache()
+        # release the dialog's widgets - the main window owns it, so dropping the reference alone won't free it
+        if self._dlg is not None:
+            self._dlg.deleteLater()
+        self._dlg = None
+
+    def _clear_xform_cache(self) -> None:
+        """Drops the cached coordinate transforms."""
+        self._xform_cache.clear()
 
     def run(self):
-        """Run method that performs all the real work"""
-        # show the dialog
+        """Shows the dialog non-modally, the simulation runs once the dialog is accepted."""
         self.dlg.show()
-        result: int = self.dlg.exec_()  # returns 1 if pressed
-        if result:
-            # prepare extents layer
+        self.dlg.raise_()
+        self.dlg.activateWindow()
+
+    def _on_accept(self) -> None:
+        """Runs the simulation for the accepted dialog parameters."""
+        src_feature = self.dlg.selected_feature
+        src_geom = src_feature.geometry()
+        # bail early on malformed extents rather than partway through the simulation
+        if not src_geom.isGeosValid():
+            src_geom = src_geom.makeValid()
+        if src_geom.isEmpty() or not src_geom.isGeosValid() or src_geom.area() <= 0:
+            self.iface.messageBar().pushCritical("Futurb", "The selected extents geometry is empty or invalid.")
+            return
+        project = QgsProject.instance()
+        # prepare extents layer - for display only, the simulation takes the geometry directly
+        # reuse the layer from a previous run if it is still in the project and in the same CRS
+        extents_layer: QgsVectorLayer | None = None
+        for prev_layer in project.mapLayersByName(_EXTENTS_LAYER_NAME):
+            if prev_layer.providerType() != "memory":
+                continue
+            if extents_layer is None and prev_layer.crs() == self.dlg.selected_crs:
+                extents_layer = prev_layer
+            else:
+                project.removeMapLayer(prev_layer)
+        reuse_extents = extents_layer is not None
+        if extents_layer is None:
             extents_layer = QgsVectorLayer(
-                f"Polygon?crs={self.dlg.selected_crs.authid()}&field=id:integer&index=yes",
-                "sim_input_extents",
+                f"Polygon?crs={self.dlg.selected_crs.authid()}&field=id:integer",
+                _EXTENTS_LAYER_NAME,
                 "memory",
             )
-            #
-            src_feature = self.dlg.selected_feature
-            src_geom = src_feature.geometry()
-            target_feature = QgsFeature(id=1)
-            crs_transform = QgsCoordinateTransform(
-                self.dlg.selected_layer.crs(), self.dlg.selected_crs, QgsProject.instance()
-            )
+        target_feature = QgsFeature(id=1)
+        # reuse the transform when re-running with the same CRS pair
+        xform_key = (self.dlg.selected_layer.crs().toWkt(), self.dlg.selected_crs.toWkt())
+        crs_transform = self._xform_cache.get(xform_key)
+        if crs_transform is None:
+            crs_transform = QgsCoordinateTransform(self.dlg.selected_layer.crs(), self.dlg.selected_crs, project)
+            self._xform_cache[xform_key] = crs_transform
+        # QgsGeometry.transform already reprojects all vertices in one native call, skip it for identical CRS
+        if not crs_transform.isShortCircuited():
             src_geom.transform(crs_transform)
-            target_feature.setGeometry(src_geom)
-            extents_layer.dataProvider().addFeature(target_feature)
-            extents_layer.dataProvider().updateExtents()
-            QgsProject.instance().addMapLayer(extents_layer, addToLegend=True)
-            extents_layer.extent().xMinimum
-            # None checking is handled by dialogue
-            granularity_m: int = int(self.dlg.grid_size_m.text())  # type: ignore
-            n_steps = int(self.dlg.n_iterations.text())
+        target_feature.setGeometry(src_geom)
+        # the feature ID is set explicitly and never read back, so skip the provider's ID sync
+        provider = extents_layer.dataProvider()
+        if reuse_extents:
+            provider.truncate()
+        provider.addFeatures([target_feature], QgsFeatureSink.FastInsert)
+        provider.updateExtents()
+        # build the spatial index once all features are in, rather than maintaining it per insert
+        provider.createSpatialIndex()
+        params = self.dlg.to_params()
+        # anchor the timeline on today's date so that repeated runs share the same temporal extents
+        start_date = datetime.combine(date.today(), datetime.min.time())
+        # relativedelta clamps Feb 29 to Feb 28 in non-leap years where replace(year=...) raises
+        end_date = start_date + relativedelta(years=params.n_steps)
+        # suspend canvas rendering while layers are added, otherwise each step's raster triggers a redraw
+        canvas = self.iface.mapCanvas()
+        render_flag = canvas.renderFlag()
+        canvas.setRenderFlag(False)
+        try:
+            if reuse_extents:
+                extents_layer.updateExtents()
+                extents_layer.triggerRepaint()
+            else:
+                project.addMapLayer(extents_layer, addToLegend=True)
             # run
             run_isobenefit_simulation(
-                extents_layer=extents_layer,
-                granularity_m=granularity_m,
+                extents_geom=src_geom,
                 target_crs=self.dlg.selected_crs,
-                n_steps=n_steps,
                 out_dir_path=self.dlg.out_dir_path,  # type: ignore
                 out_file_name=self.dlg.out_file_name,  # type: ignore
-                build_probability=float(self.dlg.build_prob.text()),
-                neighboring_centrality_probability=float(self.dlg.nb_cent.text()),
-                isolated_centrality_probability=float(self.dlg.isolated_cent.text()),
-                T_star=int(self.dlg.t_star.text()),
-                random_seed=int(self.dlg.random_seed.text()),
+                start_date=start_date,
                 initialization_mode="list",
-                max_population=int(self.dlg.max_population.text()),
-                max_ab_km2=int(self.dlg.max_ab_km2.text()),
                 urbanism_model="isobenefit",
-                prob_distribution=(0.7, 0.3, 0),
-                density_factors=(1, 0.1, 0.01),
+                prob_distribution=_DEFAULT_PROB_DIST,
+                density_factors=_DEFAULT_DENSITY_FACTORS,
+                **asdict(params),
             )
-            # setup temporal controller
-            start_date = datetime.now()
-            end_date = start_date.replace(year=start_date.year + n_steps)
-            temporal: QgsTemporalNavigationObject = cast(
-                QgsTemporalNavigationObject, self.iface.mapCanvas().temporalController()
-            )
-            temporal.setTemporalExtents(QgsDateTimeRange(begin=start_date, end=end_date))
-            temporal.rewindToStart()
+        finally:
+            canvas.setRenderFlag(render_flag)
+            canvas.refresh()
+        # setup temporal controller
+        temporal: QgsTemporalNavigationObject = cast(QgsTemporalNavigationObject, canvas.temporalController())
+        # each setter emits signals to every temporal layer, so only reconfigure what the controller doesn't hold
+        # compared against the controller itself as the user or a project load may have changed it since
+        temporal_extents = QgsDateTimeRange(begin=start_date, end=end_date)
+        frame_duration = QgsInterval(1, 0, 0, 0, 0, 0, 0)  # one year
+        if temporal.temporalExtents() != temporal_extents:
+            temporal.setTemporalExtents(temporal_extents)
+        if not temporal.isLooping():
             temporal.setLooping(True)
-            temporal.setFrameDuration(QgsInterval(1, 0, 0, 0, 0, 0, 0))  # one year
+        if temporal.frameDuration() != frame_duration:
+            temporal.setFrameDuration(frame_duration)
+        if temporal.framesPerSecond() != 2:
             temporal.setFramesPerSecond(2)
-            temporal.setAnimationState(QgsTemporalNavigationObject.Forward)
-        else:
-            print("no result")
-            QgsMessageLog.logMessage("no result", level=Qgis.Warning, notifyUser=True)
+        temporal.rewindToStart()
+        temporal.setAnimationState(QgsTemporalNavigationObject.Forward)
+
+    def _on_reject(self) -> None:
+        """Logs dialog cancellation."""
+        QgsMessageLog.logMessage("dialog cancelled", "Futurb", level=Qgis.Info, notifyUser=False)
@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 import logging
+from dataclasses import dataclass
 from pathlib import Path
 
 from qgis.core import QgsCoordinateReferenceSystem, QgsFeature, QgsMapLayerProxyModel, QgsVectorLayer
@@ -11,6 +12,9 @@ from qgis.PyQt import QtCore, QtWidgets
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# spin boxes round to their decimals, so allow for small per-cell probabilities such as 5e-5
+_PROB_DECIMALS = 6
+
 
 class LayerSpec:
 
@@ -23,6 +27,21 @@ class LayerSpec:
         self.qgis_layer = qgis_layer
 
 
+@dataclass(frozen=True)
+class SimParams:
+    """Simulation parameters parsed from the dialog's widgets."""
+
+    granularity_m: int
+    n_steps: int
+    build_probability: float
+    neighboring_centrality_probability: float
+    isolated_centrality_probability: float
+    T_star: int
+    random_seed: int
+    max_population: int
+    max_ab_km2: int
+
+
 class FuturbDialog(QtWidgets.QDialog):
     """ """
 
@@ -81,47 +100,71 @@ class FuturbDialog(QtWidgets.QDialog):
         # grid size
         self.grid_size_m_label = QtWidgets.QLabel("Grid size in metres", self)
         self.grid.addWidget(self.grid_size_m_label, 2, 0, alignment=QtCore.Qt.AlignRight)
-        self.grid_size_m = QtWidgets.QLineEdit("100", self)
+        self.grid_size_m = QtWidgets.QSpinBox(self)
+        self.grid_size_m.setRange(1, 10000)
+        self.grid_size_m.setValue(100)
         self.grid.addWidget(self.grid_size_m, 2, 1)
         # iterations
         self.n_iterations_label = QtWidgets.QLabel("Iterations", self)
         self.grid.addWidget(self.n_iterations_label, 3, 0, alignment=QtCore.Qt.AlignRight)
-        self.n_iterations = QtWidgets.QLineEdit("5", self)
+        self.n_iterations = QtWidgets.QSpinBox(self)
+        self.n_iterations.setRange(1, 1000)
+        self.n_iterations.setValue(5)
         self.grid.addWidget(self.n_iterations, 3, 1)
         # max population
         self.max_population_label = QtWidgets.QLabel("Max Population", self)
         self.grid.addWidget(self.max_population_label, 4, 0, alignment=QtCore.Qt.AlignRight)
-        self.max_population = QtWidgets.QLineEdit("500000", self)
+        self.max_population = QtWidgets.QSpinBox(self)
+        self.max_population.setRange(1, 2000000000)
+        self.max_population.setValue(500000)
         self.grid.addWidget(self.max_population, 4, 1)
         # max ab / km2
         self.max_ab_km2_label = QtWidgets.QLabel("Max ab/km2", self)
         self.grid.addWidget(self.max_ab_km2_label, 5, 0, alignment=QtCore.Qt.AlignRight)
-        self.max_ab_km2 = QtWidgets.QLineEdit("10000", self)
+        self.max_ab_km2 = QtWidgets.QSpinBox(self)
+        self.max_ab_km2.setRange(1, 1000000)
+        self.max_ab_km2.setValue(10000)
         self.grid.addWidget(self.max_ab_km2, 5, 1)
         # build prob
         self.build_prob_label = QtWidgets.QLabel("Build probability", self)
         self.grid.addWidget(self.build_prob_label, 6, 0, alignment=QtCore.Qt.AlignRight)
-        self.build_prob = QtWidgets.QLineEdit("0.5", self)
+        self.build_prob = QtWidgets.QDoubleSpinBox(self)
+        self.build_prob.setRange(0, 1)
+        self.build_prob.setDecimals(_PROB_DECIMALS)
+        self.build_prob.setSingleStep(0.05)
+        self.build_prob.setValue(0.5)
         self.grid.addWidget(self.build_prob, 6, 1)
         # nb centrality prob
         self.nb_cent_label = QtWidgets.QLabel("Neighbouring prob.", self)
         self.grid.addWidget(self.nb_cent_label, 7, 0, alignment=QtCore.Qt.AlignRight)
-        self.nb_cent = QtWidgets.QLineEdit("0.005", self)
+        self.nb_cent = QtWidgets.QDoubleSpinBox(self)
+        self.nb_cent.setRange(0, 1)
+        self.nb_cent.setDecimals(_PROB_DECIMALS)
+        self.nb_cent.setSingleStep(0.001)
+        self.nb_cent.setValue(0.005)
         self.grid.addWidget(self.nb_cent, 7, 1)
         # isolated centrality prob
         self.isolated_cent_label = QtWidgets.QLabel("Isolated centrality prob.", self)
         self.grid.addWidget(self.isolated_cent_label, 8, 0, alignment=QtCore.Qt.AlignRight)
-        self.isolated_cent = QtWidgets.QLineEdit("0.1", self)
+        self.isolated_cent = QtWidgets.QDoubleSpinBox(self)
+        self.isolated_cent.setRange(0, 1)
+        self.isolated_cent.setDecimals(_PROB_DECIMALS)
+        self.isolated_cent.setSingleStep(0.01)
+        self.isolated_cent.setValue(0.1)
         self.grid.addWidget(self.isolated_cent, 8, 1)
         # T star
         self.t_star_label = QtWidgets.QLabel("T*", self)
         self.grid.addWidget(self.t_star_label, 9, 0, alignment=QtCore.Qt.AlignRight)
-        self.t_star = QtWidgets.QLineEdit("10", self)
+        self.t_star = QtWidgets.QSpinBox(self)
+        self.t_star.setRange(1, 1000)
+        self.t_star.setValue(10)
         self.grid.addWidget(self.t_star, 9, 1)
         # random seed
         self.random_seed_label = QtWidgets.QLabel("Random Seed", self)
         self.grid.addWidget(self.random_seed_label, 10, 0, alignment=QtCore.Qt.AlignRight)
-        self.random_seed = QtWidgets.QLineEdit("42", self)
+        self.random_seed = QtWidgets.QSpinBox(self)
+        self.random_seed.setRange(0, 2147483647)
+        self.random_seed.setValue(42)
         self.grid.addWidget(self.random_seed, 10, 1)
         # spacer
         self.grid.addItem(
@@ -208,6 +251,21 @@ class FuturbDialog(QtWidgets.QDialog):
         self.handle_output_path()
         return super().show()
 
+    def to_params(self) -> SimParams:
+        """Reads each parameter widget once."""
+        # spin boxes enforce types and ranges, so no parsing is needed
+        return SimParams(
+            granularity_m=self.grid_size_m.value(),
+            n_steps=self.n_iterations.value(),
+            build_probability=self.build_prob.value(),
+            neighboring_centrality_probability=self.nb_cent.value(),
+            isolated_centrality_probability=self.isolated_cent.value(),
+            T_star=self.t_star.value(),
+            random_seed=self.random_seed.value(),
+            max_population=self.max_population.value(),
+            max_ab_km2=self.max_ab_km2.value(),
+        )
+
     def reset_state(self) -> None:
         """ """
         self.button_box.button(QtWidgets.QDialogButtonBox.Ok).setDisabled(True)